@@ -5,16 +5,41 @@ Automatically organize files into folders based on file types, dates, or custom
 """
 
 import os
+import sys
+import errno
 import shutil
 import argparse
+import bisect
+import itertools
+import threading
 from pathlib import Path
 from datetime import datetime
-from typing import Dict, List, Optional, Callable
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Callable, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
 import logging
 import json
 from colorama import init, Fore, Style
 from tqdm import tqdm
 
+# Optional: multi-pattern matching for organizing by name patterns
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Optional: batched renames through io_uring (Linux only)
+try:
+    import liburing
+except ImportError:
+    liburing = None
+
+# Optional: compact name tracking for target folders with a huge number of files
+try:
+    import pybloom_live
+except ImportError:
+    pybloom_live = None
+
 # Initialize colorama for cross-platform colored output
 init()
 
@@ -22,6 +47,56 @@ init()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def _invert_categories(categories: Dict[str, List[str]]) -> Dict[str, str]:
+    """Invert a categories mapping into an extension -> category lookup."""
+    ext_to_category = {}
+    for category, extensions in categories.items():
+        for ext in extensions:
+            # The first category listing an extension wins
+            ext_to_category.setdefault(ext, category)
+    return ext_to_category
+
+class _NameSet(set):
+    """Taken names of a folder, compared case-insensitively."""
+    
+    # Names are stored casefolded: on the case-insensitive macOS and Windows
+    # defaults, "Report.pdf" would otherwise overwrite "report.pdf". On
+    # case-sensitive filesystems this at worst adds a needless counter.
+    
+    def __contains__(self, name: str) -> bool:
+        return super().__contains__(name.casefold())
+    
+    def add(self, name: str):
+        super().add(name.casefold())
+    
+    def discard(self, name: str):
+        super().discard(name.casefold())
+
+class _BloomNameSet:
+    """Taken names of a very large folder, kept in a Bloom filter instead of a set."""
+    
+    def __init__(self, folder: str, keys: Iterable[str]):
+        self.folder = folder
+        # Casefolded names, as in _NameSet
+        self.existing = pybloom_live.ScalableBloomFilter(error_rate=0.001)
+        for key in keys:
+            self.existing.add(key)
+        # Names handed out during this run may not exist on disk yet
+        self.added = _NameSet()
+    
+    def __contains__(self, name: str) -> bool:
+        if name in self.added:
+            return True
+        # A Bloom filter miss is definite; a hit is confirmed on disk, where
+        # the filesystem decides whether case matters
+        return name.casefold() in self.existing and os.path.lexists(os.path.join(self.folder, name))
+    
+    def add(self, name: str):
+        self.added.add(name)
+    
+    def discard(self, name: str):
+        self.added.discard(name)
+
 class FolderOrganizer:
     # Default file type categories
     DEFAULT_CATEGORIES = {
@@ -37,31 +112,102 @@ class FolderOrganizer:
         'Fonts': ['.ttf', '.otf', '.woff', '.woff2', '.eot']
     }
     
+    # Extension -> category lookup for the default categories, built at import
+    _DEFAULT_EXT_INDEX = MappingProxyType(_invert_categories(DEFAULT_CATEGORIES))
+    
+    # Renames submitted to io_uring per batch
+    URING_QUEUE_DEPTH = 256
+    # Files handed to the thread pool per batch
+    MOVE_BATCH_SIZE = 256
+    # Folder descriptors kept open for renameat-style moves
+    MAX_DIR_FDS = 256
+    # Target folders with this many files track names in a Bloom filter
+    BLOOM_THRESHOLD = 100_000
+    
     def __init__(self, source_dir: str, target_dir: Optional[str] = None, 
-                 dry_run: bool = True, copy_files: bool = False):
+                 dry_run: bool = True, copy_files: bool = False,
+                 undo_log: Optional[str] = None):
         self.source_dir = Path(source_dir)
         self.target_dir = Path(target_dir) if target_dir else self.source_dir
+        # Plain string form used when building paths for every file
+        self._target_dir_str = str(self.target_dir)
         self.dry_run = dry_run
         self.copy_files = copy_files
         self.moved_files = []
         self.failed_files = []
+        # Names already present in each target folder, read once per folder
+        self._taken_names: Dict[str, Union[_NameSet, _BloomNameSet]] = {}
+        # Guards shared state while moves run on worker threads
+        self._lock = threading.Lock()
+        # Extension -> category lookup for the last categories mapping used
+        self._ext_index: Optional[Tuple[Dict[str, List[str]], Dict[str, str]]] = None
+        # Open folder descriptors, so renames don't re-resolve full paths
+        self._dir_fds: Dict[str, int] = {}
         
         if not self.source_dir.exists():
             raise FileNotFoundError(f"Source directory {source_dir} does not exist")
-    
-    def get_files(self, recursive: bool = False, include_hidden: bool = False) -> List[Path]:
-        """Get all files from the source directory."""
-        files = []
-        pattern = "**/*" if recursive else "*"
         
-        for item in self.source_dir.glob(pattern):
-            if item.is_file():
-                # Skip hidden files unless requested
-                if not include_hidden and item.name.startswith('.'):
-                    continue
-                files.append(item)
+        # Moves within one filesystem can be done as plain renames
+        target_root = self.target_dir
+        while not target_root.exists() and target_root != target_root.parent:
+            target_root = target_root.parent
+        self._same_dev = self.source_dir.stat().st_dev == target_root.stat().st_dev
+        
+        # Moves are streamed to a JSONL undo log as they happen. It is opened
+        # on the first move, so a run that moves nothing keeps an earlier log.
+        self._undo_log = None
+        self._undo_log_path = None
+        if undo_log and not self.dry_run:
+            self._undo_log_path = os.path.abspath(undo_log)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def close(self):
+        """Close the undo log, if one is open."""
+        with self._lock:
+            if self._undo_log is not None:
+                self._undo_log.close()
+                self._undo_log = None
+    
+    def get_files(self, recursive: bool = False, include_hidden: bool = False) -> Iterator[os.DirEntry]:
+        """Yield all files from the source directory."""
+        pending = [str(self.source_dir)]
+        # The undo log, and the undo script written next to it, may sit inside
+        # the folder being organized
+        undo_files = {}
+        if self._undo_log_path is not None:
+            for path in (self._undo_log_path, str(Path(self._undo_log_path).with_suffix('.py'))):
+                undo_files[os.path.basename(path)] = path
         
-        return sorted(files)
+        # Walk with os.scandir so file type checks come from the cached
+        # directory listing instead of a stat() per entry
+        while pending:
+            directory = pending.pop()
+            try:
+                entries = os.scandir(directory)
+            except OSError as e:
+                # Like os.walk, skip folders that can't be listed
+                logger.error(f"Failed to read folder {directory}: {e}")
+                continue
+            
+            with entries:
+                for entry in entries:
+                    # Skip hidden files and folders unless requested
+                    if not include_hidden and entry.name.startswith('.'):
+                        continue
+                    # Symlinked folders aren't descended into, but symlinked
+                    # files are organized like regular ones
+                    if entry.is_dir(follow_symlinks=False):
+                        if recursive:
+                            pending.append(entry.path)
+                    elif entry.is_file():
+                        if entry.name in undo_files and os.path.abspath(entry.path) == undo_files[entry.name]:
+                            continue
+                        yield entry
     
     def organize_by_type(self, categories: Optional[Dict[str, List[str]]] = None, 
                         recursive: bool = False, include_hidden: bool = False) -> Dict[str, int]:
@@ -69,56 +215,62 @@ class FolderOrganizer:
         if categories is None:
             categories = self.DEFAULT_CATEGORIES
         
+        ext_to_category = self._get_ext_index(categories)
         files = self.get_files(recursive, include_hidden)
-        stats = {}
-        
-        print(f"{Fore.CYAN}Organizing {len(files)} files by type...{Style.RESET_ALL}")
+        work = []
         
-        for file_path in tqdm(files, desc="Organizing", unit="file"):
-            file_ext = file_path.suffix.lower()
+        for entry in files:
+            file_ext = os.path.splitext(entry.name)[1].lower()
             
             # Find matching category
-            target_folder = "Others"
-            for category, extensions in categories.items():
-                if file_ext in extensions:
-                    target_folder = category
-                    break
+            target_folder = ext_to_category.get(file_ext, "Others")
             
-            # Move file to appropriate folder
-            if self._move_file(file_path, target_folder):
-                stats[target_folder] = stats.get(target_folder, 0) + 1
+            work.append((entry.path, entry.name, target_folder))
         
-        return stats
+        print(f"{Fore.CYAN}Organizing {len(work)} files by type...{Style.RESET_ALL}")
+        
+        # Move files to appropriate folders
+        return self._move_all(work)
+    
+    def _get_ext_index(self, categories: Dict[str, List[str]]) -> Mapping[str, str]:
+        """Get the extension -> category lookup for a categories mapping."""
+        if categories is FolderOrganizer.DEFAULT_CATEGORIES:
+            return self._DEFAULT_EXT_INDEX
+        
+        # Custom categories are inverted once and reused while they are passed again
+        if self._ext_index is None or self._ext_index[0] is not categories:
+            self._ext_index = (categories, _invert_categories(categories))
+        
+        return self._ext_index[1]
     
     def organize_by_date(self, date_format: str = "%Y-%m", 
                         use_creation_date: bool = False,
                         recursive: bool = False, include_hidden: bool = False) -> Dict[str, int]:
         """Organize files by their modification or creation date."""
         files = self.get_files(recursive, include_hidden)
-        stats = {}
-        
-        print(f"{Fore.CYAN}Organizing {len(files)} files by date...{Style.RESET_ALL}")
+        work = []
         
-        for file_path in tqdm(files, desc="Organizing", unit="file"):
+        for entry in files:
             try:
                 # Get file date
                 if use_creation_date:
-                    timestamp = file_path.stat().st_ctime
+                    timestamp = entry.stat().st_ctime
                 else:
-                    timestamp = file_path.stat().st_mtime
+                    timestamp = entry.stat().st_mtime
                 
                 file_date = datetime.fromtimestamp(timestamp)
                 folder_name = file_date.strftime(date_format)
                 
-                # Move file to date folder
-                if self._move_file(file_path, folder_name):
-                    stats[folder_name] = stats.get(folder_name, 0) + 1
+                work.append((entry.path, entry.name, folder_name))
                     
             except Exception as e:
-                logger.error(f"Failed to get date for {file_path.name}: {e}")
-                self.failed_files.append(str(file_path))
+                logger.error(f"Failed to get date for {entry.name}: {e}")
+                self.failed_files.append(entry.path)
         
-        return stats
+        print(f"{Fore.CYAN}Organizing {len(work)} files by date...{Style.RESET_ALL}")
+        
+        # Move files to date folders
+        return self._move_all(work)
     
     def organize_by_size(self, size_ranges: Optional[Dict[str, tuple]] = None,
                         recursive: bool = False, include_hidden: bool = False) -> Dict[str, int]:
@@ -131,55 +283,82 @@ class FolderOrganizer:
                 'Very Large (> 100MB)': (100*1024*1024, float('inf'))
             }
         
-        files = self.get_files(recursive, include_hidden)
-        stats = {}
+        # Ranges sorted by lower bound can be binary searched, as long as they
+        # don't overlap (otherwise the first listed match has to win)
+        sorted_ranges = sorted(size_ranges.items(), key=lambda item: item[1][0])
+        range_mins = [min_size for _, (min_size, _) in sorted_ranges]
+        disjoint = all(sorted_ranges[i][1][1] <= sorted_ranges[i + 1][1][0]
+                       for i in range(len(sorted_ranges) - 1))
         
-        print(f"{Fore.CYAN}Organizing {len(files)} files by size...{Style.RESET_ALL}")
+        files = self.get_files(recursive, include_hidden)
+        work = []
         
-        for file_path in tqdm(files, desc="Organizing", unit="file"):
+        for entry in files:
             try:
-                file_size = file_path.stat().st_size
+                file_size = entry.stat().st_size
                 
                 # Find matching size range
                 target_folder = "Unknown Size"
-                for range_name, (min_size, max_size) in size_ranges.items():
-                    if min_size <= file_size < max_size:
-                        target_folder = range_name
-                        break
+                if disjoint:
+                    index = bisect.bisect_right(range_mins, file_size) - 1
+                    if index >= 0 and file_size < sorted_ranges[index][1][1]:
+                        target_folder = sorted_ranges[index][0]
+                else:
+                    for range_name, (min_size, max_size) in size_ranges.items():
+                        if min_size <= file_size < max_size:
+                            target_folder = range_name
+                            break
                 
-                # Move file to size folder
-                if self._move_file(file_path, target_folder):
-                    stats[target_folder] = stats.get(target_folder, 0) + 1
+                work.append((entry.path, entry.name, target_folder))
                     
             except Exception as e:
-                logger.error(f"Failed to get size for {file_path.name}: {e}")
-                self.failed_files.append(str(file_path))
+                logger.error(f"Failed to get size for {entry.name}: {e}")
+                self.failed_files.append(entry.path)
         
-        return stats
+        print(f"{Fore.CYAN}Organizing {len(work)} files by size...{Style.RESET_ALL}")
+        
+        # Move files to size folders
+        return self._move_all(work)
     
     def organize_by_name_pattern(self, patterns: Dict[str, str],
                                recursive: bool = False, include_hidden: bool = False) -> Dict[str, int]:
         """Organize files based on filename patterns."""
-        files = self.get_files(recursive, include_hidden)
-        stats = {}
+        # Lowercase patterns once rather than for every file
+        patterns_lc = [(folder_name, pattern.lower()) for folder_name, pattern in patterns.items()]
         
-        print(f"{Fore.CYAN}Organizing {len(files)} files by name patterns...{Style.RESET_ALL}")
+        # With pyahocorasick, one pass over a name finds every pattern in it
+        automaton = None
+        if ahocorasick is not None and patterns_lc and all(pattern for _, pattern in patterns_lc):
+            automaton = ahocorasick.Automaton()
+            for index, (folder_name, pattern) in enumerate(patterns_lc):
+                if pattern not in automaton:
+                    automaton.add_word(pattern, (index, folder_name))
+            automaton.make_automaton()
+        
+        files = self.get_files(recursive, include_hidden)
+        work = []
         
-        for file_path in tqdm(files, desc="Organizing", unit="file"):
-            filename = file_path.name.lower()
+        for entry in files:
+            filename = entry.name.lower()
             
-            # Find matching pattern
+            # Find matching pattern, the first listed one winning
             target_folder = "Others"
-            for folder_name, pattern in patterns.items():
-                if pattern.lower() in filename:
-                    target_folder = folder_name
-                    break
+            if automaton is not None:
+                matches = [match for _, match in automaton.iter(filename)]
+                if matches:
+                    target_folder = min(matches)[1]
+            else:
+                for folder_name, pattern in patterns_lc:
+                    if pattern in filename:
+                        target_folder = folder_name
+                        break
             
-            # Move file to pattern folder
-            if self._move_file(file_path, target_folder):
-                stats[target_folder] = stats.get(target_folder, 0) + 1
+            work.append((entry.path, entry.name, target_folder))
         
-        return stats
+        print(f"{Fore.CYAN}Organizing {len(work)} files by name patterns...{Style.RESET_ALL}")
+        
+        # Move files to pattern folders
+        return self._move_all(work)
     
     def organize_by_custom_rules(self, rules_file: str,
                                recursive: bool = False, include_hidden: bool = False) -> Dict[str, int]:
@@ -187,135 +366,460 @@ class FolderOrganizer:
         with open(rules_file, 'r', encoding='utf-8') as f:
             rules = json.load(f)
         
-        files = self.get_files(recursive, include_hidden)
-        stats = {}
+        compiled_rules = self._compile_custom_rules(rules)
+        default_folder = rules.get('default_folder', 'Others')
+        
+        # Only gather the file details some rule actually looks at
+        conditions = [rule.get('conditions', {}) for rule in rules.get('rules', [])]
+        needs_ext = any('extensions' in c for c in conditions)
+        needs_name = any('name_contains' in c for c in conditions)
+        needs_size = any('size_range' in c for c in conditions)
         
-        print(f"{Fore.CYAN}Organizing {len(files)} files using custom rules...{Style.RESET_ALL}")
+        files = self.get_files(recursive, include_hidden)
+        work = []
         
-        for file_path in tqdm(files, desc="Organizing", unit="file"):
-            target_folder = self._apply_custom_rules(file_path, rules)
+        for entry in files:
+            filename = entry.name.lower() if needs_name else ''
+            file_ext = os.path.splitext(entry.name)[1].lower() if needs_ext else ''
+            file_size = entry.stat().st_size if needs_size else 0
+            
+            # First matching rule wins
+            target_folder = default_folder
+            for matches, folder in compiled_rules:
+                if matches(file_ext, filename, file_size):
+                    target_folder = folder
+                    break
             
-            if self._move_file(file_path, target_folder):
-                stats[target_folder] = stats.get(target_folder, 0) + 1
+            work.append((entry.path, entry.name, target_folder))
         
-        return stats
+        print(f"{Fore.CYAN}Organizing {len(work)} files using custom rules...{Style.RESET_ALL}")
+        
+        return self._move_all(work)
     
-    def _apply_custom_rules(self, file_path: Path, rules: Dict) -> str:
-        """Apply custom rules to determine target folder."""
-        filename = file_path.name.lower()
-        file_ext = file_path.suffix.lower()
-        file_size = file_path.stat().st_size
+    def _compile_custom_rules(self, rules: Dict) -> List[Tuple[Callable[[str, str, int], bool], str]]:
+        """Compile custom rules into (predicate, folder) pairs with normalized conditions."""
+        compiled = []
         
-        # Check each rule
         for rule in rules.get('rules', []):
             conditions = rule.get('conditions', {})
-            folder = rule.get('folder', 'Others')
             
-            match = True
+            # Normalize each condition once instead of once per file
+            extensions = conditions.get('extensions')
+            if extensions is not None:
+                extensions = frozenset(ext.lower() for ext in extensions)
             
-            # Check extension condition
-            if 'extensions' in conditions:
-                if file_ext not in conditions['extensions']:
-                    match = False
+            name_contains = conditions.get('name_contains')
+            if name_contains is not None:
+                name_contains = name_contains.lower()
             
-            # Check name pattern condition
-            if 'name_contains' in conditions and match:
-                if conditions['name_contains'].lower() not in filename:
-                    match = False
+            min_size, max_size = conditions.get('size_range', (None, None))
             
-            # Check size condition
-            if 'size_range' in conditions and match:
-                min_size, max_size = conditions['size_range']
-                if not (min_size <= file_size <= max_size):
-                    match = False
+            def predicate(file_ext: str, filename: str, file_size: int,
+                          exts=extensions, name_sub=name_contains, lo=min_size, hi=max_size) -> bool:
+                return ((exts is None or file_ext in exts) and
+                        (name_sub is None or name_sub in filename) and
+                        (lo is None or lo <= file_size <= hi))
             
-            if match:
-                return folder
+            compiled.append((predicate, rule.get('folder', 'Others')))
         
-        return rules.get('default_folder', 'Others')
+        return compiled
     
-    def _move_file(self, source_path: Path, target_folder: str) -> bool:
-        """Move or copy a file to the target folder."""
+    def _move_all(self, work: List[Tuple[str, str, str]]) -> Dict[str, int]:
+        """Move or copy classified files, using a thread pool when executing."""
+        stats = {}
+        
+        # Folder contents may have changed since a previous call, and a dry
+        # run's reservations never reached the disk, so list folders afresh
+        self._taken_names.clear()
+        
+        # A dry run only logs, so there is no I/O worth spreading over threads
+        if self.dry_run:
+            for source_path, name, target_folder, target_path in self._reserve_targets(work):
+                if self._move_file(source_path, name, target_folder, target_path):
+                    stats[target_folder] = stats.get(target_folder, 0) + 1
+            return stats
+        
+        # Create every target directory once before any file is moved. A folder
+        # created here is known to be empty, so its names need no listing later.
+        for target_folder in {target_folder for _, _, target_folder in work}:
+            target_dir = os.path.join(self._target_dir_str, target_folder)
+            try:
+                os.makedirs(target_dir)
+                self._taken_names[target_dir] = _NameSet()
+            except FileExistsError:
+                pass
+            except OSError as e:
+                logger.error(f"Failed to create folder {target_folder}: {e}")
+        
         try:
-            # Create target directory
-            target_dir = self.target_dir / target_folder
-            
-            if not self.dry_run:
-                target_dir.mkdir(parents=True, exist_ok=True)
-            
-            # Generate target file path
-            target_path = target_dir / source_path.name
-            
-            # Handle name conflicts
-            counter = 1
-            original_target = target_path
-            while target_path.exists() and not self.dry_run:
-                stem = original_target.stem
-                suffix = original_target.suffix
-                target_path = target_dir / f"{stem}_{counter}{suffix}"
-                counter += 1
+            # Same-device moves can be batched through io_uring when it is available
+            if liburing is not None and self._same_dev and not self.copy_files:
+                uring_stats = self._move_all_uring(work)
+                if uring_stats is not None:
+                    return uring_stats
             
+            # Moves and copies are I/O bound, so threads overlap the syscalls.
+            # Names are reserved here in work order, so the names picked don't
+            # depend on thread scheduling and match the dry run.
+            max_workers = min(32, (os.cpu_count() or 1) * 4)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor, \
+                    self._progress(total=len(work)) as progress:
+                for start in range(0, len(work), self.MOVE_BATCH_SIZE):
+                    chunk = work[start:start + self.MOVE_BATCH_SIZE]
+                    batch = self._reserve_targets(chunk)
+                    results = executor.map(lambda item: self._move_file(*item), batch)
+                    for (_, _, target_folder, _), moved in zip(batch, results):
+                        if moved:
+                            stats[target_folder] = stats.get(target_folder, 0) + 1
+                    self._flush_undo_log()
+                    progress.update(len(chunk))
+        finally:
+            self._flush_undo_log()
+            self._close_dir_fds()
+        
+        return stats
+    
+    def _move_all_uring(self, work: List[Tuple[str, str, str]]) -> Optional[Dict[str, int]]:
+        """Rename files through io_uring in batches, or return None if it can't be set up."""
+        ring = liburing.Ring()
+        try:
+            liburing.io_uring_queue_init(self.URING_QUEUE_DEPTH, ring)
+        except OSError as e:
+            # e.g. an old kernel or a seccomp profile that blocks io_uring
+            logger.debug(f"io_uring unavailable, using threads: {e}")
+            return None
+        
+        stats = {}
+        cqe = liburing.Cqe()
+        
+        try:
+            with self._progress(total=len(work)) as progress:
+                for start in range(0, len(work), self.URING_QUEUE_DEPTH):
+                    chunk = work[start:start + self.URING_QUEUE_DEPTH]
+                    
+                    # The ring only borrows the path strings, so the batch keeps
+                    # them referenced until every rename in it has completed
+                    batch = []
+                    for source_path, name, target_folder, target_path in self._reserve_targets(chunk):
+                        source, target, source_fd, target_fd = self._rename_args(source_path, target_path)
+                        sqe = liburing.io_uring_get_sqe(ring)
+                        if source_fd is None:
+                            liburing.io_uring_prep_rename(sqe, source, target, liburing.RENAME_NOREPLACE)
+                        else:
+                            liburing.io_uring_prep_rename(sqe, source, target, liburing.RENAME_NOREPLACE,
+                                                          source_fd, target_fd)
+                        liburing.io_uring_sqe_set_data64(sqe, len(batch))
+                        batch.append((source_path, name, target_folder, target_path, source, target))
+                    
+                    if batch:
+                        liburing.io_uring_submit_and_wait(ring, len(batch))
+                    
+                    for _ in batch:
+                        liburing.io_uring_wait_cqe(ring, cqe)
+                        completion = cqe[0]
+                        source_path, name, target_folder, target_path, _, _ = batch[completion.user_data]
+                        try:
+                            # Reading res raises the rename's error, if any
+                            completion.res
+                            error = None
+                        except OSError as e:
+                            error = e
+                        liburing.io_uring_cq_advance(ring, 1)
+                        
+                        try:
+                            # A recursive walk can still cross a mount point, and some
+                            # filesystems reject RENAME_NOREPLACE; move those the regular way
+                            if error is not None and error.errno in (errno.EXDEV, errno.EINVAL):
+                                self._rename_file(source_path, target_path)
+                            elif error is not None:
+                                raise error
+                        except Exception as e:
+                            logger.error(f"Failed to move {name}: {e}")
+                            self.failed_files.append(source_path)
+                            self._release_target(target_path)
+                            continue
+                        
+                        logger.debug(f"Moved: {name} → {target_folder}/")
+                        self._record_move(source_path, target_path)
+                        stats[target_folder] = stats.get(target_folder, 0) + 1
+                    
+                    self._flush_undo_log()
+                    progress.update(len(chunk))
+        finally:
+            liburing.io_uring_queue_exit(ring)
+        
+        return stats
+    
+    def _progress(self, iterable=None, total: int = 0) -> tqdm:
+        """Create a progress bar that redraws sparingly and stays off when not on a terminal."""
+        return tqdm(iterable, total=total, desc="Organizing", unit="file",
+                    mininterval=0.5, miniters=max(1, total // 200), smoothing=0,
+                    disable=not sys.stderr.isatty())
+    
+    def _record_move(self, source_path: str, target_path: str):
+        """Record a finished move, appending it to the undo log when one is open."""
+        with self._lock:
+            self.moved_files.append(target_path)
+            if self._undo_log is None and self._undo_log_path is not None:
+                try:
+                    self._undo_log = open(self._undo_log_path, 'w', encoding='utf-8')
+                except OSError as e:
+                    # The move itself succeeded; the undo script falls back to the source root
+                    logger.error(f"Failed to open undo log {self._undo_log_path}: {e}")
+                    self._undo_log_path = None
+            if self._undo_log is not None:
+                self._undo_log.write(json.dumps({
+                    "src": os.path.abspath(source_path),
+                    "dst": os.path.abspath(target_path),
+                }) + "\n")
+    
+    def _flush_undo_log(self):
+        """Write buffered undo log records to disk, so a killed run keeps them."""
+        with self._lock:
+            if self._undo_log is not None:
+                self._undo_log.flush()
+    
+    def _reserve_target(self, name: str, target_folder: str) -> str:
+        """Pick a free target path for a file, adding a counter on name conflicts."""
+        target_dir = os.path.join(self._target_dir_str, target_folder)
+        
+        # Handle name conflicts
+        target_name = name
+        with self._lock:
+            taken = self._get_taken_names(target_dir)
+            if target_name in taken:
+                stem, suffix = os.path.splitext(name)
+                counter = 1
+                while target_name in taken:
+                    target_name = f"{stem}_{counter}{suffix}"
+                    counter += 1
+            taken.add(target_name)
+        
+        return os.path.join(target_dir, target_name)
+    
+    def _reserve_targets(self, work: List[Tuple[str, str, str]]) -> List[Tuple[str, str, str, str]]:
+        """Reserve target paths for files in order, dropping files that can't get one."""
+        reserved = []
+        for source_path, name, target_folder in work:
+            try:
+                target_path = self._reserve_target(name, target_folder)
+            except Exception as e:
+                logger.error(f"Failed to move {name}: {e}")
+                with self._lock:
+                    self.failed_files.append(source_path)
+                continue
+            reserved.append((source_path, name, target_folder, target_path))
+        return reserved
+    
+    def _release_target(self, target_path: str):
+        """Free a reserved target name after its move failed."""
+        target_dir, target_name = os.path.split(target_path)
+        # A name that now exists on disk (e.g. a file created meanwhile) stays taken
+        if os.path.lexists(target_path):
+            return
+        with self._lock:
+            taken = self._taken_names.get(target_dir)
+            if taken is not None:
+                taken.discard(target_name)
+    
+    def _move_file(self, source_path: str, name: str, target_folder: str, target_path: str) -> bool:
+        """Move or copy a file to its reserved path in the target folder."""
+        try:
             if self.dry_run:
                 logger.info(f"Would move: {source_path} → {target_path}")
             else:
                 if self.copy_files:
-                    shutil.copy2(source_path, target_path)
-                    logger.info(f"Copied: {source_path.name} → {target_folder}/")
+                    self._copy_file(source_path, target_path)
+                    logger.debug(f"Copied: {name} → {target_folder}/")
                 else:
-                    shutil.move(str(source_path), str(target_path))
-                    logger.info(f"Moved: {source_path.name} → {target_folder}/")
+                    self._rename_file(source_path, target_path)
+                    logger.debug(f"Moved: {name} → {target_folder}/")
                 
-                self.moved_files.append(str(target_path))
+                self._record_move(source_path, target_path)
             
             return True
             
         except Exception as e:
-            logger.error(f"Failed to move {source_path.name}: {e}")
-            self.failed_files.append(str(source_path))
+            logger.error(f"Failed to move {name}: {e}")
+            with self._lock:
+                self.failed_files.append(source_path)
+            self._release_target(target_path)
             return False
     
+    def _rename_file(self, source_path: str, target_path: str):
+        """Move a file, renaming in place when source and target share a device.
+        
+        Target names are reserved from a listing taken earlier, so the move
+        never replaces a file that has appeared at the target since.
+        """
+        if self._same_dev:
+            source, target, source_fd, target_fd = self._rename_args(source_path, target_path)
+            try:
+                if os.name == 'nt':
+                    # Windows rename already fails when the target exists
+                    os.rename(source, target)
+                    return
+                try:
+                    # POSIX rename replaces an existing target, but a hard link
+                    # can't, so link to the new name and then drop the old one
+                    os.link(source, target, src_dir_fd=source_fd, dst_dir_fd=target_fd,
+                            follow_symlinks=False)
+                except OSError as e:
+                    # e.g. FAT volumes, or protected_hardlinks for files of other users
+                    if e.errno not in (errno.EPERM, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EMLINK):
+                        raise
+                    self._check_target_free(target_path)
+                    os.rename(source, target, src_dir_fd=source_fd, dst_dir_fd=target_fd)
+                else:
+                    os.unlink(source, dir_fd=source_fd)
+                return
+            except OSError as e:
+                # A recursive walk can still cross a mount point
+                if e.errno != errno.EXDEV:
+                    raise
+        
+        self._check_target_free(target_path)
+        shutil.move(source_path, target_path)
+    
+    def _check_target_free(self, target_path: str):
+        """Fail instead of overwriting a file that appeared at a reserved target path."""
+        if os.path.lexists(target_path):
+            raise FileExistsError(errno.EEXIST, "Target already exists", target_path)
+    
+    def _rename_args(self, source_path: str, target_path: str) -> Tuple[str, str, Optional[int], Optional[int]]:
+        """Split a rename into bare names relative to open folder descriptors, where supported."""
+        if os.rename in os.supports_dir_fd:
+            source_dir, source_name = os.path.split(source_path)
+            target_dir, target_name = os.path.split(target_path)
+            source_fd = self._get_dir_fd(source_dir)
+            target_fd = self._get_dir_fd(target_dir)
+            if source_fd is not None and target_fd is not None:
+                return source_name, target_name, source_fd, target_fd
+        
+        return source_path, target_path, None, None
+    
+    def _get_dir_fd(self, directory: str) -> Optional[int]:
+        """Get an open descriptor for a folder, or None if it can't be cached."""
+        with self._lock:
+            fd = self._dir_fds.get(directory)
+            if fd is None and len(self._dir_fds) < self.MAX_DIR_FDS:
+                try:
+                    fd = os.open(directory, os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0))
+                except OSError:
+                    return None
+                self._dir_fds[directory] = fd
+            return fd
+    
+    def _close_dir_fds(self):
+        """Close the folder descriptors opened for renames."""
+        with self._lock:
+            for fd in self._dir_fds.values():
+                os.close(fd)
+            self._dir_fds.clear()
+    
+    def _copy_file(self, source_path: str, target_path: str):
+        """Copy a file and its metadata, keeping the data in the kernel where possible."""
+        # Creating the target exclusively makes the copy fail, instead of
+        # overwriting, when a file has appeared there since the folder was listed
+        with open(source_path, 'rb') as src, open(target_path, 'xb') as dst:
+            remaining = os.fstat(src.fileno()).st_size
+            if hasattr(os, 'copy_file_range'):
+                try:
+                    while remaining > 0:
+                        copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+                        if copied == 0:
+                            # Some filesystems report no progress instead of an error
+                            break
+                        remaining -= copied
+                except OSError as e:
+                    # Older kernels and some filesystems can't do it; use the regular copy
+                    if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP):
+                        raise
+        
+        # Only a complete copy counts; otherwise redo it the regular way
+        if remaining == 0:
+            shutil.copystat(source_path, target_path)
+        else:
+            shutil.copy2(source_path, target_path)
+    
+    def _get_taken_names(self, target_dir: str) -> Union[_NameSet, _BloomNameSet]:
+        """Get the names already used in a target folder, listing it only once."""
+        taken = self._taken_names.get(target_dir)
+        if taken is None:
+            taken = _NameSet()
+            # A dry run may point at folders that don't exist yet
+            if os.path.isdir(target_dir):
+                with os.scandir(target_dir) as entries:
+                    # Casefolded up front, so set.update can store them as they are
+                    names = (entry.name.casefold() for entry in entries)
+                    taken.update(itertools.islice(names, self.BLOOM_THRESHOLD))
+                    if len(taken) == self.BLOOM_THRESHOLD and pybloom_live is not None:
+                        taken = _BloomNameSet(target_dir, itertools.chain(taken, names))
+                    else:
+                        taken.update(names)
+            self._taken_names[target_dir] = taken
+        return taken
+    
     def create_undo_script(self, output_file: str = "undo_organization.py"):
         """Create a script to undo the organization."""
         if not self.moved_files:
             print(f"{Fore.YELLOW}No files were moved, no undo script needed{Style.RESET_ALL}")
             return
         
+        # The script streams moves from a manifest instead of embedding them
+        if self._undo_log_path is not None:
+            self._flush_undo_log()
+            manifest_file = self._undo_log_path
+        else:
+            # Without a log of original paths, files go back to the source root
+            manifest_file = str(Path(output_file).with_suffix('.jsonl'))
+            with open(manifest_file, 'w', encoding='utf-8') as f:
+                for target_path in self.moved_files:
+                    source_path = os.path.join(self.source_dir, os.path.basename(target_path))
+                    f.write(json.dumps({
+                        "src": os.path.abspath(source_path),
+                        "dst": os.path.abspath(target_path),
+                    }) + "\n")
+        
         undo_script = f'''#!/usr/bin/env python3
 """
 Auto-generated undo script for folder organization
 Run this script to move files back to their original locations
 """
 
+import json
 import shutil
 from pathlib import Path
 
 def undo_organization():
-    moved_files = {self.moved_files}
-    source_dir = Path("{self.source_dir}")
+    manifest_file = {os.path.abspath(manifest_file)!r}
     
     success_count = 0
-    for file_path in moved_files:
-        try:
-            file_path = Path(file_path)
-            if file_path.exists():
-                target_path = source_dir / file_path.name
-                
-                # Handle name conflicts
-                counter = 1
-                original_target = target_path
-                while target_path.exists():
-                    stem = original_target.stem
-                    suffix = original_target.suffix
-                    target_path = source_dir / f"{{stem}}_{{counter}}{{suffix}}"
-                    counter += 1
-                
-                shutil.move(str(file_path), str(target_path))
-                print(f"Moved back: {{file_path.name}}")
-                success_count += 1
-            else:
-                print(f"File not found: {{file_path}}")
-        except Exception as e:
-            print(f"Failed to move {{file_path}}: {{e}}")
+    with open(manifest_file, 'r', encoding='utf-8') as manifest:
+        for line in manifest:
+            record = json.loads(line)
+            file_path = Path(record["dst"])
+            try:
+                if file_path.exists():
+                    target_path = Path(record["src"])
+                    target_path.parent.mkdir(parents=True, exist_ok=True)
+                    
+                    # Handle name conflicts
+                    counter = 1
+                    original_target = target_path
+                    while target_path.exists():
+                        stem = original_target.stem
+                        suffix = original_target.suffix
+                        target_path = original_target.parent / f"{{stem}}_{{counter}}{{suffix}}"
+                        counter += 1
+                    
+                    shutil.move(str(file_path), str(target_path))
+                    print(f"Moved back: {{file_path.name}}")
+                    success_count += 1
+                else:
+                    print(f"File not found: {{file_path}}")
+            except Exception as e:
+                print(f"Failed to move {{file_path}}: {{e}}")
     
     print(f"Successfully moved back {{success_count}} files")
 
@@ -407,22 +911,29 @@ def main():
                        help="Execute organization (default is dry run)")
     parser.add_argument("--create-undo", action="store_true",
                        help="Create undo script after organization")
+    parser.add_argument("--verbose", action="store_true",
+                       help="Log every moved or copied file")
     
     # Utilities
     parser.add_argument("--create-sample-rules", help="Create sample custom rules file")
     
     args = parser.parse_args()
     
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+    
     if args.create_sample_rules:
         create_sample_rules(args.create_sample_rules)
         return
     
+    organizer = None
     try:
         organizer = FolderOrganizer(
             args.source_dir, 
             args.target_dir, 
             dry_run=not args.execute,
-            copy_files=args.copy
+            copy_files=args.copy,
+            undo_log="undo_organization.jsonl" if args.create_undo else None
         )
         
         stats = {}
@@ -479,6 +990,9 @@ def main():
     except Exception as e:
         logger.error(f"Error: {e}")
         exit(1)
+    finally:
+        if organizer is not None:
+            organizer.close()
 
 if __name__ == "__main__":
     main()